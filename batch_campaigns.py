@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from campaign_store import CampaignStore
+from JailBreak import run_campaign_async
+
+def parse_seed(line, line_no):
+    # A line is either a JSON string or an object carrying the seed under "seed"
+    # (falling back to "prompt"/"body"); an "id"/"request_id" is carried through.
+    record = json.loads(line)
+    if isinstance(record, str):
+        return str(line_no), record
+    seed = record.get("seed") or record.get("prompt") or record.get("body")
+    if not seed:
+        raise ValueError(f"line {line_no}: no 'seed', 'prompt' or 'body' field")
+    seed_id = record.get("id") or record.get("request_id") or str(line_no)
+    return str(seed_id), seed
+
+async def read_seeds(input_path, queue, workers):
+    with open(input_path, "r") as f:
+        for line_no, line in enumerate(f, start=1):
+            if line.strip():
+                await queue.put((line_no, line))
+    for _ in range(workers):
+        await queue.put(None)
+
+async def campaign_worker(queue, out, semaphore, iterations, counters, store=None, resume=False):
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+        line_no, line = item
+        start = time.perf_counter()
+        try:
+            seed_id, seed = parse_seed(line, line_no)
+            working, refused = await run_campaign_async(
+                seed, iterations, semaphore=semaphore, verbose=False, store=store, resume=resume)
+            result = {"id": seed_id, "seed": seed, "working_prompts": working, "refused_prompts": refused}
+            counters["succeeded"] += 1
+        except Exception as e:
+            result = {"id": str(line_no), "error": f"{type(e).__name__}: {e}"}
+            counters["failed"] += 1
+        result["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+        # Single event loop thread: whole lines are written and flushed as campaigns finish
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+
+async def run_batch(input_path, output_path, workers=8, max_in_flight=32, iterations=6, store=None, resume=False):
+    # Campaigns run on `workers` tasks; the semaphore bounds model requests across all of them.
+    # With a CampaignStore every attempt is recorded, and resume=True continues unfinished campaigns.
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=max_in_flight))
+    semaphore = asyncio.Semaphore(max_in_flight)
+    queue = asyncio.Queue(maxsize=workers * 2)
+    counters = {"succeeded": 0, "failed": 0}
+
+    with open(output_path, "w") as out:
+        await asyncio.gather(
+            read_seeds(input_path, queue, workers),
+            *(campaign_worker(queue, out, semaphore, iterations, counters, store, resume) for _ in range(workers)),
+        )
+    return counters
+
+def main():
+    parser = argparse.ArgumentParser(description="Run red-team campaigns for every seed in a JSONL file")
+    parser.add_argument("input", help="JSONL file of seeds")
+    parser.add_argument("output", help="JSONL file that receives one result per campaign")
+    parser.add_argument("--workers", type=int, default=8, help="campaigns running at once")
+    parser.add_argument("--max-in-flight", type=int, default=32, help="model requests in flight across all campaigns")
+    parser.add_argument("--iterations", type=int, default=6)
+    parser.add_argument("--store", help="SQLite campaign store recording every attempt")
+    parser.add_argument("--resume", action="store_true", help="continue unfinished campaigns found in --store")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = CampaignStore(args.store) if args.store else None
+    try:
+        counters = asyncio.run(run_batch(
+            args.input, args.output, args.workers, args.max_in_flight, args.iterations, store, args.resume))
+    finally:
+        if store is not None:
+            store.close()
+    elapsed = time.perf_counter() - start
+    print(f"Campaigns finished: {counters['succeeded']}, failed: {counters['failed']}, in {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Import and process start-up time of the CLI entry points, each in a fresh interpreter.
+
+Reports the median time to import each module, the median wall time of a whole
+`python -c "import <module>"` process next to a bare interpreter, and which heavy
+dependencies (Gemini SDK, FAISS, numpy) the import pulled in; none should be.
+
+    python benchmarks/bench_import.py --runs 10 --output import.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["Manager", "trainedManager", "JailBreak", "keyword_helper", "batch_campaigns", "sqllite"]
+HEAVY_MODULES = ["google.generativeai", "faiss", "numpy", "dotenv"]
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def run_process(code):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO, capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, result.stdout
+
+def measure(module, runs):
+    imports, walls, heavy = [], [], set()
+    for _ in range(runs):
+        wall, out = run_process(PROBE.format(module=module, heavy=HEAVY_MODULES))
+        probe = json.loads(out.strip().splitlines()[-1])
+        walls.append(wall)
+        imports.append(probe["seconds"])
+        heavy.update(probe["heavy"])
+    return {
+        "import_ms": round(statistics.median(imports) * 1000, 2),
+        "process_ms": round(statistics.median(walls) * 1000, 2),
+        "heavy_imports": sorted(heavy),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--modules", default=",".join(MODULES))
+    parser.add_argument("--output", help="write the results as JSON here")
+    parser.add_argument("--max-import-ms", type=float, help="exit non-zero if any module imports slower than this")
+    args = parser.parse_args()
+
+    run_process("pass")  # warm the filesystem cache and byte-compile once
+    for module in args.modules.split(","):
+        run_process(f"import {module}")
+
+    baseline = statistics.median(run_process("pass")[0] for _ in range(args.runs))
+    results = {"python": sys.version.split()[0], "runs": args.runs, "interpreter_ms": round(baseline * 1000, 2), "modules": {}}
+    print(f"{'bare interpreter':18} {'':>10}   process {baseline * 1000:8.2f} ms")
+    slow = []
+    for module in args.modules.split(","):
+        stats = results["modules"][module] = measure(module, args.runs)
+        print(f"{module:18} import {stats['import_ms']:8.2f} ms   process {stats['process_ms']:8.2f} ms"
+              + (f"   heavy: {', '.join(stats['heavy_imports'])}" if stats["heavy_imports"] else ""))
+        if args.max_import_ms is not None and stats["import_ms"] > args.max_import_ms:
+            slow.append(module)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if slow:
+        print("Slower than --max-import-ms:", ", ".join(slow))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
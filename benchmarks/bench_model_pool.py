@@ -0,0 +1,56 @@
+"""Per-call model setup: fresh GenerativeModel per request vs the shared ModelPool.
+
+Runs offline: it times everything a request does before the network round trip
+(building the model object and resolving its client), not the round trip itself.
+Both variants use the SDK's one per-process client and channel, so the difference
+is object construction only, a few microseconds per call.
+
+    python benchmarks/bench_model_pool.py --calls 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google.generativeai as genai
+from google.generativeai import client
+from llm_backend import MODEL_NAMES, ModelPool
+
+def fresh_setup(model_name):
+    model = genai.GenerativeModel(model_name)
+    model._client = client.get_default_generative_client()
+    return model
+
+def pooled_setup(pool, model_name):
+    model = pool.get(model_name)
+    if model._client is None:
+        model._client = client.get_default_generative_client()
+    return model
+
+def time_calls(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(MODEL_NAMES[i % len(MODEL_NAMES)])
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY") or "benchmark-key")
+    pool = ModelPool()
+    pool.warm()
+
+    fresh = time_calls(fresh_setup, args.calls)
+    pooled = time_calls(lambda name: pooled_setup(pool, name), args.calls)
+
+    print(f"calls:            {args.calls}")
+    print(f"fresh per call:   {fresh / args.calls * 1e6:9.2f} us")
+    print(f"pooled per call:  {pooled / args.calls * 1e6:9.2f} us")
+    print(f"setup removed:    {(fresh - pooled) / args.calls * 1e6:9.2f} us/call ({fresh / max(pooled, 1e-12):.0f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import json
+import sqlite3
+import threading
+import time
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS campaigns (
+    campaign_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    seed TEXT NOT NULL,
+    iterations INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL
+)""",
+    # One attacker answer per campaign iteration; replayed on resume instead of asking again
+    """CREATE TABLE IF NOT EXISTS attacker_outputs (
+    campaign_id INTEGER NOT NULL REFERENCES campaigns(campaign_id),
+    iteration INTEGER NOT NULL,
+    output TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (campaign_id, iteration)
+)""",
+    """CREATE TABLE IF NOT EXISTS attempts (
+    attempt_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    campaign_id INTEGER NOT NULL REFERENCES campaigns(campaign_id),
+    iteration INTEGER NOT NULL,
+    strategy INTEGER NOT NULL,
+    prompt TEXT NOT NULL,
+    generated_sql TEXT,
+    verdict TEXT NOT NULL,
+    source TEXT,
+    reused INTEGER NOT NULL DEFAULT 0,
+    latency_ms REAL,
+    created_at REAL NOT NULL,
+    UNIQUE (campaign_id, iteration, strategy)
+)""",
+    """CREATE TABLE IF NOT EXISTS extracted_phrases (
+    campaign_id INTEGER NOT NULL REFERENCES campaigns(campaign_id),
+    iteration INTEGER NOT NULL,
+    strategy INTEGER NOT NULL,
+    phrases TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (campaign_id, iteration, strategy)
+)""",
+    "CREATE INDEX IF NOT EXISTS idx_campaigns_seed ON campaigns(seed, finished_at)",
+    "CREATE INDEX IF NOT EXISTS idx_attempts_verdict ON attempts(verdict, campaign_id)",
+    "CREATE INDEX IF NOT EXISTS idx_attempts_prompt ON attempts(prompt)",
+]
+
+class CampaignRecord:
+    """What a campaign already has on disk: attacker outputs and attempts keyed by (iteration, strategy)."""
+
+    def __init__(self, campaign_id, seed, iterations, outputs=None, attempts=None):
+        self.campaign_id = campaign_id
+        self.seed = seed
+        self.iterations = iterations
+        self.outputs = outputs or {}
+        self.attempts = attempts or {}
+
+class CampaignStore:
+    """Append-only SQLite log of red-team campaigns.
+
+    Attempts, attacker outputs and extracted phrases are buffered and written in
+    one transaction per `batch_size` rows (and on flush/close); campaign starts
+    and finishes are written at once. Apart from a campaign's finished_at, rows
+    are never updated, so an interrupted campaign is resumed by replaying them.
+    """
+
+    _INSERTS = {
+        "attacker_outputs": "INSERT OR IGNORE INTO attacker_outputs VALUES (?, ?, ?, ?)",
+        "attempts": (
+            "INSERT OR IGNORE INTO attempts (campaign_id, iteration, strategy, prompt, generated_sql, "
+            "verdict, source, reused, latency_ms, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        ),
+        "extracted_phrases": "INSERT OR IGNORE INTO extracted_phrases VALUES (?, ?, ?, ?, ?)",
+    }
+
+    def __init__(self, path="campaigns.db", batch_size=64):
+        self.path = path
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        self._pending = {"attacker_outputs": [], "attempts": [], "extracted_phrases": []}
+        self._lock = threading.Lock()
+
+    def _append(self, table, row):
+        with self._lock:
+            self._pending[table].append(row)
+            if sum(len(rows) for rows in self._pending.values()) >= self.batch_size:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not any(self._pending.values()):
+            return
+        self._conn.execute("BEGIN")
+        try:
+            for table, rows in self._pending.items():
+                if rows:
+                    self._conn.executemany(self._INSERTS[table], rows)
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        for rows in self._pending.values():
+            rows.clear()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+    def start_campaign(self, seed, iterations) -> CampaignRecord:
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO campaigns (seed, iterations, started_at) VALUES (?, ?, ?)", (seed, iterations, time.time())
+            )
+            return CampaignRecord(cur.lastrowid, seed, iterations)
+
+    def resume_campaign(self, seed, iterations) -> CampaignRecord:
+        # The newest unfinished campaign for `seed` with everything it stored, or a new one
+        with self._lock:
+            self._flush_locked()
+            row = self._conn.execute(
+                "SELECT campaign_id, iterations FROM campaigns WHERE seed = ? AND finished_at IS NULL "
+                "ORDER BY campaign_id DESC LIMIT 1",
+                (seed,),
+            ).fetchone()
+        if row is None:
+            return self.start_campaign(seed, iterations)
+        return self.load_campaign(row[0], max(iterations, row[1]))
+
+    def load_campaign(self, campaign_id, iterations=None) -> CampaignRecord:
+        with self._lock:
+            self._flush_locked()
+            seed, stored_iterations = self._conn.execute(
+                "SELECT seed, iterations FROM campaigns WHERE campaign_id = ?", (campaign_id,)
+            ).fetchone()
+            outputs = dict(self._conn.execute(
+                "SELECT iteration, output FROM attacker_outputs WHERE campaign_id = ?", (campaign_id,)
+            ))
+            attempts = {}
+            for row in self._conn.execute(
+                "SELECT iteration, strategy, prompt, generated_sql, verdict, source, reused, latency_ms "
+                "FROM attempts WHERE campaign_id = ? ORDER BY iteration, strategy",
+                (campaign_id,),
+            ):
+                attempts[row[0], row[1]] = {
+                    "prompt": row[2], "sql": row[3], "verdict": row[4], "source": row[5],
+                    "reused": bool(row[6]), "latency_ms": row[7],
+                }
+            for iteration, strategy, phrases in self._conn.execute(
+                "SELECT iteration, strategy, phrases FROM extracted_phrases WHERE campaign_id = ?", (campaign_id,)
+            ):
+                if (iteration, strategy) in attempts:
+                    attempts[iteration, strategy]["phrases"] = json.loads(phrases)
+        return CampaignRecord(campaign_id, seed, iterations or stored_iterations, outputs, attempts)
+
+    def record_output(self, campaign, iteration, output):
+        campaign.outputs[iteration] = output
+        self._append("attacker_outputs", (campaign.campaign_id, iteration, output, time.time()))
+
+    def record_attempt(self, campaign, iteration, strategy, prompt, result):
+        # `result` is a JailBreak.evaluate_prompt_details() dict
+        campaign.attempts[iteration, strategy] = dict(result, prompt=prompt)
+        self._append("attempts", (
+            campaign.campaign_id, iteration, strategy, prompt, result.get("sql"), result["verdict"],
+            result.get("source"), int(result.get("reused", False)), result.get("latency_ms"), time.time(),
+        ))
+
+    def record_phrases(self, campaign, iteration, strategy, phrases):
+        if (iteration, strategy) in campaign.attempts:
+            campaign.attempts[iteration, strategy]["phrases"] = list(phrases)
+        self._append("extracted_phrases", (
+            campaign.campaign_id, iteration, strategy, json.dumps(list(phrases), ensure_ascii=False), time.time()
+        ))
+
+    def finish_campaign(self, campaign):
+        with self._lock:
+            self._flush_locked()
+            self._conn.execute(
+                "UPDATE campaigns SET finished_at = ? WHERE campaign_id = ? AND finished_at IS NULL",
+                (time.time(), campaign.campaign_id),
+            )
+
+    def attempts(self, verdict=None, seed=None, prompt=None, limit=1000) -> list:
+        # Stored attempts (newest first) as dicts, filtered on the indexed columns
+        clauses, params = [], []
+        if verdict:
+            clauses.append("a.verdict = ?")
+            params.append(verdict)
+        if seed:
+            clauses.append("c.seed = ?")
+            params.append(seed)
+        if prompt:
+            clauses.append("a.prompt = ?")
+            params.append(prompt)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            self._flush_locked()
+            cur = self._conn.execute(
+                "SELECT a.campaign_id, c.seed, a.iteration, a.strategy, a.prompt, a.generated_sql, a.verdict, "
+                "a.source, a.reused, a.latency_ms FROM attempts a JOIN campaigns c ON c.campaign_id = a.campaign_id "
+                f"{where} ORDER BY a.attempt_id DESC LIMIT ?",
+                (*params, limit),
+            )
+            columns = [d[0] for d in cur.description]
+            return [dict(zip(columns, row)) for row in cur]
+
+    def summary(self) -> list:
+        # (campaign_id, seed, attempts, successes, finished) for every campaign
+        with self._lock:
+            self._flush_locked()
+            return self._conn.execute(
+                "SELECT c.campaign_id, c.seed, COUNT(a.attempt_id), "
+                "COALESCE(SUM(a.verdict = 'SUCCESS'), 0), c.finished_at IS NOT NULL "
+                "FROM campaigns c LEFT JOIN attempts a ON a.campaign_id = c.campaign_id "
+                "GROUP BY c.campaign_id ORDER BY c.campaign_id"
+            ).fetchall()
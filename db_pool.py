@@ -0,0 +1,52 @@
+import os
+import sqlite3
+import threading
+from urllib.parse import quote
+
+_local = threading.local()
+_wal_ready = set()
+_wal_lock = threading.Lock()
+
+def ensure_wal(db_name: str):
+    # journal_mode is stored in the database file, so this only writes the first
+    # time a database is seen; read-only connections cannot switch it themselves.
+    path = os.path.abspath(db_name)
+    if path in _wal_ready:
+        return
+    with _wal_lock:
+        if path in _wal_ready or not os.path.exists(path):
+            return
+        try:
+            conn = sqlite3.connect(path)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass  # e.g. read-only filesystem: stay in the current journal mode
+        _wal_ready.add(path)
+
+def open_readonly(db_name: str, cached_statements=256) -> sqlite3.Connection:
+    path = os.path.abspath(db_name)
+    if not os.path.exists(path):
+        raise sqlite3.OperationalError(f"unable to open database file: {db_name}")
+    ensure_wal(path)
+    conn = sqlite3.connect(f"file:{quote(path)}?mode=ro", uri=True, cached_statements=cached_statements)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+def get_connection(db_name: str) -> sqlite3.Connection:
+    """Read-only connection to `db_name` owned by the calling thread, opened on first use."""
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_name)
+    if conn is None:
+        conn = connections[db_name] = open_readonly(db_name)
+    return conn
+
+def close_connections():
+    connections = getattr(_local, "connections", {})
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
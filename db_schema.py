@@ -0,0 +1,158 @@
+import sqlite3
+import string
+import time
+
+# Applied in order; PRAGMA user_version records the last one that ran
+MIGRATIONS = [
+    (1, [
+        """CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(50) NOT NULL,
+    email VARCHAR(50) UNIQUE NOT NULL
+)""",
+        """CREATE TABLE IF NOT EXISTS contacts (
+    contact_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    name VARCHAR(50) NOT NULL,
+    phone VARCHAR(15) NOT NULL,
+    email VARCHAR(50),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+)""",
+    ]),
+    (2, [
+        # Earlier versions of sqllite.py inserted the sample contacts again on every run
+        "DELETE FROM contacts WHERE contact_id NOT IN "
+        "(SELECT MIN(contact_id) FROM contacts GROUP BY user_id, name)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_contacts_user_name ON contacts(user_id, name)",
+        "CREATE INDEX IF NOT EXISTS idx_users_name ON users(name)",
+        "CREATE INDEX IF NOT EXISTS idx_users_name_nocase ON users(name COLLATE NOCASE)",
+    ]),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+SAMPLE_USERS = [
+    ('Alice', 'alice@example.com'),
+    ('Bob', 'bob@example.com'),
+    ('Charlie', 'charlie@example.com'),
+    ('David', 'david@example.com'),
+    ('Emma', 'emma@example.com'),
+    ('Frank', 'frank@example.com'),
+    ('Grace', 'grace@example.com'),
+    ('Hannah', 'hannah@example.com'),
+]
+
+# (owner email, contact name, phone, contact email)
+SAMPLE_CONTACTS = [
+    ('alice@example.com', 'John Doe', '123-456-7890', 'johndoe@example.com'),
+    ('alice@example.com', 'Jane Smith', '987-654-3210', 'janesmith@example.com'),
+    ('alice@example.com', 'Samuel Adams', '555-123-4567', 'samueladams@example.com'),
+    ('bob@example.com', 'Mike Johnson', '555-666-7777', 'mikejohnson@example.com'),
+    ('bob@example.com', 'Sarah Lee', '444-333-2222', 'sarahlee@example.com'),
+    ('charlie@example.com', 'Peter Parker', '999-888-7777', 'spidey@example.com'),
+    ('charlie@example.com', 'Mary Jane', '888-777-6666', 'mj@example.com'),
+    ('charlie@example.com', 'Harry Osborn', '777-666-5555', 'harryosborn@example.com'),
+    ('david@example.com', 'Clark Kent', '111-222-3333', 'clarkkent@example.com'),
+    ('david@example.com', 'Lois Lane', '222-333-4444', 'loislane@example.com'),
+    ('emma@example.com', 'Bruce Wayne', '123-321-4567', 'brucewayne@example.com'),
+    ('emma@example.com', 'Alfred Pennyworth', '321-456-7890', 'alfred@example.com'),
+    ('frank@example.com', 'Tony Stark', '555-987-6543', 'tonystark@example.com'),
+    ('frank@example.com', 'Pepper Potts', '666-999-8888', 'pepper@example.com'),
+    ('grace@example.com', 'Steve Rogers', '123-987-6543', 'cap@example.com'),
+    ('grace@example.com', 'Bucky Barnes', '789-654-3210', 'bucky@example.com'),
+    ('hannah@example.com', 'Natasha Romanoff', '654-321-9876', 'blackwidow@example.com'),
+    ('hannah@example.com', 'Clint Barton', '222-111-9999', 'hawkeye@example.com'),
+]
+
+INSERT_USER_SQL = "INSERT OR IGNORE INTO users (name, email) VALUES (?, ?)"
+INSERT_CONTACT_SQL = (
+    "INSERT OR IGNORE INTO contacts (user_id, name, phone, email) "
+    "SELECT user_id, ?, ?, ? FROM users WHERE email = ?"
+)
+
+FIRST_NAMES = [
+    "Ava", "Ben", "Chloe", "Dan", "Ella", "Finn", "Gia", "Hugo", "Ivy", "Jack", "Kara", "Liam",
+    "Mia", "Noah", "Olive", "Paul", "Quinn", "Rose", "Sam", "Tara", "Uma", "Vince", "Wren", "Zoe",
+]
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Bring `conn`'s database up to SCHEMA_VERSION; returns the number of migrations applied."""
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    applied = 0
+    for version, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.execute("BEGIN")  # explicit, so the DDL is part of the transaction too
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        applied += 1
+    return applied
+
+def seed_sample(conn: sqlite3.Connection):
+    # Users are keyed by email and contacts by (user, name), so re-running inserts nothing
+    with conn:
+        conn.executemany(INSERT_USER_SQL, SAMPLE_USERS)
+        conn.executemany(
+            INSERT_CONTACT_SQL,
+            ((name, phone, email, owner) for owner, name, phone, email in SAMPLE_CONTACTS),
+        )
+
+_TRIGRAMS = [a + b + c for a in string.ascii_lowercase for b in string.ascii_lowercase for c in string.ascii_lowercase]
+
+def synthetic_surname(n: int) -> str:
+    # Six letters, unique below 26**6, so generated names still look like names to intent_parser
+    return (_TRIGRAMS[n // 17576 % 17576] + _TRIGRAMS[n % 17576]).capitalize()
+
+def _synthetic_users(start, count):
+    for n in range(start, start + count):
+        yield f"{FIRST_NAMES[n % len(FIRST_NAMES)]} {synthetic_surname(n)}", f"user{n}@bulk.example"
+
+def _synthetic_contacts(start, count, per_user):
+    for n in range(start, start + count):
+        owner = f"user{n}@bulk.example"
+        for k in range(per_user):
+            m = n * per_user + k
+            yield (
+                f"{FIRST_NAMES[m % len(FIRST_NAMES)]} {synthetic_surname(m)}",
+                f"{m // 10_000_000 % 1000:03d}-{m // 10_000 % 1000:03d}-{m % 10_000:04d}",
+                f"contact{m}@bulk.example",
+                owner,
+            )
+
+def bulk_generate(db_name: str, users: int, contacts_per_user=5, start=0) -> dict:
+    """Load `users` synthetic users with `contacts_per_user` contacts each in one transaction.
+
+    Users are numbered from `start`, so a repeated or resumed load skips the
+    rows already present. Durability is relaxed for the load only.
+    """
+    conn = sqlite3.connect(db_name, isolation_level=None)
+    try:
+        migrate(conn)
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA cache_size = -262144")  # 256 MiB
+        began = time.perf_counter()
+        before = conn.total_changes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(INSERT_USER_SQL, _synthetic_users(start, users))
+            users_added = conn.total_changes - before
+            conn.executemany(INSERT_CONTACT_SQL, _synthetic_contacts(start, users, contacts_per_user))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        contacts_added = conn.total_changes - before - users_added
+        conn.execute("ANALYZE")  # so the planner knows users(name) is selective
+        return {
+            "users_added": users_added,
+            "contacts_added": contacts_added,
+            "seconds": round(time.perf_counter() - began, 3),
+        }
+    finally:
+        conn.close()
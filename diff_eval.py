@@ -0,0 +1,125 @@
+import argparse
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import Manager
+import trainedManager
+from eval_farm import read_corpus
+from llm_backend import get_backend
+from query_cache import result_cache
+from sql_cache import get_sql_cache
+from tracing import percentile
+
+VERDICTS = ("SUCCESS", "BLOCKED", "REFUSED", "ERROR")
+
+def timed(evaluate, prompt):
+    start = time.perf_counter()
+    result = evaluate(prompt)
+    return result, round((time.perf_counter() - start) * 1000, 3)
+
+def run_diff(prompts, concurrency=4, output_path=None):
+    """Evaluate every prompt with Manager and trainedManager at once and compare the verdicts.
+
+    Both sides run in one process, so they share the model backend (and its rate
+    limiter), the pooled database connections and the caches. Their system prompts
+    differ, so translations are not shared between them; "shared" reports what
+    was: prompts both sides translated to the same SQL (whose rows are read once),
+    and this run's translation cache hits and coalesced requests.
+    """
+    prompts = list(prompts)
+    matrix = Counter()
+    sources = {"manager": Counter(), "trained": Counter()}
+    deltas = []
+    latencies = {"manager": [], "trained": []}
+    disagreements = []
+    same_sql = 0
+    translations, results = get_sql_cache().stats(), result_cache.stats()
+    out = open(output_path, "w", encoding="utf-8") if output_path else None
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency * 2, thread_name_prefix="diff-eval") as pool:
+            for start in range(0, len(prompts), concurrency):
+                window = [
+                    (index, prompt, pool.submit(timed, Manager.evaluate_question, prompt),
+                     pool.submit(timed, trainedManager.evaluate_question, prompt))
+                    for index, prompt in enumerate(prompts[start:start + concurrency], start=start)
+                ]
+                for index, prompt, manager_future, trained_future in window:
+                    (manager, manager_ms), (trained, trained_ms) = manager_future.result(), trained_future.result()
+                    matrix[manager["verdict"], trained["verdict"]] += 1
+                    sources["manager"][manager["source"]] += 1
+                    sources["trained"][trained["source"]] += 1
+                    latencies["manager"].append(manager_ms)
+                    latencies["trained"].append(trained_ms)
+                    deltas.append(trained_ms - manager_ms)
+                    if manager["verdict"] != trained["verdict"]:
+                        disagreements.append(index)
+                    if manager["source"] == trained["source"] == "model" and manager["sql"] == trained["sql"]:
+                        same_sql += 1
+                    if out is not None:
+                        out.write(json.dumps({
+                            "index": index, "prompt": prompt,
+                            "manager": dict(manager, latency_ms=manager_ms),
+                            "trained": dict(trained, latency_ms=trained_ms),
+                            "agree": manager["verdict"] == trained["verdict"],
+                        }, ensure_ascii=False) + "\n")
+    finally:
+        if out is not None:
+            out.close()
+    elapsed = time.perf_counter() - started
+    translations_after, results_after = get_sql_cache().stats(), result_cache.stats()
+
+    # Agreement only over pairs where both managers actually answered
+    comparable = sum(n for (m, t), n in matrix.items() if "ERROR" not in (m, t))
+    agreed = sum(n for (m, t), n in matrix.items() if m == t and m != "ERROR")
+    deltas.sort()
+    return {
+        "prompts": len(prompts),
+        "seconds": round(elapsed, 3),
+        "matrix": {m: {t: matrix[m, t] for t in VERDICTS} for m in VERDICTS},
+        "agreement": round(agreed / comparable, 4) if comparable else None,
+        "errors": len(prompts) - comparable,
+        "disagreements": disagreements,
+        "sources": {side: dict(counts) for side, counts in sources.items()},
+        "latency_ms": {
+            side: {"p50": percentile(sorted(values), 50), "p95": percentile(sorted(values), 95)}
+            for side, values in latencies.items()
+        },
+        "delta_ms": {
+            "mean": round(sum(deltas) / len(deltas), 3) if deltas else 0.0,
+            "p50": round(percentile(deltas, 50), 3),
+            "p95": round(percentile(deltas, 95), 3),
+        },
+        "shared": {
+            "same_sql": same_sql,
+            "translation_hits": sum(translations_after[k] - translations[k] for k in ("hits", "disk_hits")),
+            "coalesced": translations_after["coalesced"] - translations["coalesced"],
+            "result_hits": results_after["hits"] - results["hits"],
+        },
+        "model_calls": get_backend().stats()["calls"],
+        "sql_cache": get_sql_cache().stats(),
+        "result_cache": result_cache.stats(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Manager and trainedManager verdicts on a prompt corpus")
+    parser.add_argument("corpus", help="text or JSONL file, one prompt per line")
+    parser.add_argument("--concurrency", type=int, default=4, help="prompts evaluated at a time, each by both managers")
+    parser.add_argument("--output", help="JSONL file receiving both verdicts per prompt")
+    args = parser.parse_args()
+
+    summary = run_diff(read_corpus(args.corpus), args.concurrency, args.output)
+    print(f"{'manager/trained':18}" + "".join(f"{v:>10}" for v in VERDICTS))
+    for m in VERDICTS:
+        print(f"{m:18}" + "".join(f"{summary['matrix'][m][t]:>10}" for t in VERDICTS))
+    agreement = "n/a" if summary["agreement"] is None else f"{summary['agreement']:.1%}"
+    print(f"\nAgreement: {agreement} ({len(summary['disagreements'])} disagreements, "
+          f"{summary['errors']} with a model error)")
+    print(f"Latency delta (trained - manager): mean {summary['delta_ms']['mean']} ms, "
+          f"p50 {summary['delta_ms']['p50']} ms, p95 {summary['delta_ms']['p95']} ms")
+    print(json.dumps({k: summary[k] for k in ("latency_ms", "sources", "shared", "model_calls", "sql_cache")}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import argparse
+import importlib
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+MANAGERS = {"manager": "Manager", "trained": "trainedManager"}
+
+def read_corpus(path):
+    # One prompt per line: plain text, a JSON string, or an object with "prompt"/"seed"/"body"
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if line[0] in "{\"":
+                record = json.loads(line)
+                if isinstance(record, dict):
+                    record = record.get("prompt") or record.get("seed") or record.get("body")
+                if not record:
+                    raise ValueError(f"line {line_no}: no 'prompt', 'seed' or 'body' field")
+                line = str(record)
+            yield line
+
+def warm_worker(manager, db_name):
+    # Per-process state is built once, before the first chunk: the read-only
+    # connection with its authorizer, the phrase matcher and (trained) the phrase index
+    from phrase_matcher import get_phrase_matcher
+    from sql_authorizer import get_authorized_connection
+    get_authorized_connection(db_name)
+    get_phrase_matcher().first_match("")
+    if manager.__name__ == "trainedManager":
+        manager.match_phrases("")
+
+def worker_main(worker_id, manager_key, db_name, tasks, results):
+    manager = importlib.import_module(MANAGERS[manager_key])
+    warm_worker(manager, db_name)
+    evaluated = 0
+    busy = 0.0
+    while True:
+        chunk = tasks.get()
+        if chunk is None:
+            break
+        batch = []
+        for index, prompt in chunk:
+            start = time.perf_counter()
+            result = manager.evaluate_question(prompt)
+            elapsed = time.perf_counter() - start
+            busy += elapsed
+            batch.append((index, result["verdict"], result["source"], result["sql"], round(elapsed * 1000, 3)))
+        evaluated += len(batch)
+        results.put(("results", worker_id, batch))
+
+    from llm_backend import get_backend
+    from query_cache import result_cache
+    from sql_cache import get_sql_cache
+    results.put(("done", worker_id, {
+        "evaluated": evaluated,
+        "busy_seconds": round(busy, 3),
+        "model_calls": get_backend().stats()["calls"],
+        "sql_cache": get_sql_cache().stats(),
+        "result_cache": result_cache.stats(),
+    }))
+
+def run_farm(prompts, workers=None, manager="manager", chunk_size=32, db_name="contact_manager.db",
+             output_path=None, start_method=None):
+    """Evaluate `prompts` with `manager`'s evaluate_question on a pool of processes.
+
+    Chunks of (index, prompt) go out on a shared task queue, so faster workers
+    simply take more of them; verdicts come back on a result queue and are
+    aggregated here (and written to `output_path` as JSONL, in completion order).
+    Workers only read the database and phrases.txt, so nothing is shared but the queues.
+    """
+    workers = workers or os.cpu_count() or 1
+    ctx = mp.get_context(start_method)
+    tasks = ctx.Queue(maxsize=workers * 4)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker_main, args=(i, manager, db_name, tasks, results), daemon=True)
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    prompts = list(prompts)
+
+    def feed():
+        for offset in range(0, len(prompts), chunk_size):
+            tasks.put([(offset + j, p) for j, p in enumerate(prompts[offset:offset + chunk_size])])
+        for _ in processes:
+            tasks.put(None)
+
+    started = time.perf_counter()
+    threading.Thread(target=feed, name="eval-feeder", daemon=True).start()
+    verdicts = Counter()
+    sources = Counter()
+    latencies = []
+    worker_stats = {}
+    out = open(output_path, "w", encoding="utf-8") if output_path else None
+    try:
+        while len(worker_stats) < workers:
+            try:
+                kind, worker_id, payload = results.get(timeout=1)
+            except queue.Empty:
+                lost = [i for i, p in enumerate(processes) if not p.is_alive() and i not in worker_stats]
+                if lost:
+                    raise RuntimeError(f"evaluation workers {lost} exited without reporting")
+                continue
+            if kind == "done":
+                worker_stats[worker_id] = payload
+                continue
+            for index, verdict, source, sql, latency_ms in payload:
+                verdicts[verdict] += 1
+                sources[source] += 1
+                latencies.append(latency_ms)
+                if out is not None:
+                    out.write(json.dumps({"index": index, "prompt": prompts[index], "verdict": verdict,
+                                          "source": source, "sql": sql, "latency_ms": latency_ms},
+                                         ensure_ascii=False) + "\n")
+    finally:
+        if out is not None:
+            out.close()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "prompts": len(prompts),
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "prompts_per_second": round(len(prompts) / elapsed, 1) if elapsed else None,
+        "verdicts": dict(verdicts),
+        "sources": dict(sources),
+        "p50_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+        "worker_stats": dict(sorted(worker_stats.items())),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a prompt corpus with test_prompt on a pool of processes")
+    parser.add_argument("corpus", help="text or JSONL file, one prompt per line")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: one per core)")
+    parser.add_argument("--manager", choices=sorted(MANAGERS), default="manager")
+    parser.add_argument("--chunk-size", type=int, default=32, help="prompts handed to a worker at a time")
+    parser.add_argument("--db", default="contact_manager.db")
+    parser.add_argument("--output", help="JSONL file receiving one verdict per prompt")
+    parser.add_argument("--start-method", choices=mp.get_all_start_methods())
+    args = parser.parse_args()
+
+    summary = run_farm(read_corpus(args.corpus), args.workers, args.manager, args.chunk_size,
+                       args.db, args.output, args.start_method)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
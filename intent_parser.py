@@ -0,0 +1,50 @@
+import re
+from typing import NamedTuple
+
+# Names stay case-sensitive (capitalised words) inside otherwise case-insensitive templates
+_NAME = r"(?-i:[A-Z][a-zA-Z'-]+(?: [A-Z][a-zA-Z'-]+)?)"
+_GREETING = r"(?:(?:hi|hello|hey)(?: there)?\s*[,!.]?\s*)?"
+_INTRO = rf"(?:i am|i'm|this is|my name is)\s+(?P<user>{_NAME})\s*[,.]?\s*(?:and\s+)?"
+_REQUEST = (
+    r"(?:i\s+(?:was hoping|would like|'d like|want|wanted|need)\s+to\s+(?:get|see|view|retrieve)"
+    r"|(?:can|could|may)\s+i\s+(?:please\s+)?(?:get|see|have)"
+    r"|(?:please\s+)?(?:show|give|get|list|send)\s+me)\s+"
+)
+_END = r"\s*(?:,?\s*please)?\s*[.!?]*\s*$"
+
+_ALL_CONTACTS_RE = re.compile(
+    rf"^\s*{_GREETING}{_INTRO}{_REQUEST}(?:all\s+)?(?:of\s+)?my\s+contacts(?:\s+list)?{_END}",
+    re.IGNORECASE,
+)
+_ONE_CONTACT_RE = re.compile(
+    rf"^\s*{_GREETING}{_INTRO}{_REQUEST}(?:the\s+)?(?:contact\s+(?:information|info|details)|phone\s+number|email(?:\s+address)?|details)"
+    rf"\s+(?:for|of)\s+(?:my\s+contact\s+)?(?P<target>{_NAME}){_END}",
+    re.IGNORECASE,
+)
+
+ALL_CONTACTS_SQL = (
+    "SELECT c.name, c.phone, c.email FROM contacts c "
+    "JOIN users u ON c.user_id = u.user_id WHERE u.name = ?"
+)
+ONE_CONTACT_SQL = ALL_CONTACTS_SQL + " AND c.name = ?"
+
+class ContactIntent(NamedTuple):
+    sql: str
+    params: tuple
+    user_name: str
+
+def parse_intent(question: str):
+    """Parameterized query for the two templates in the manager prompt's examples, or None.
+
+    Only whole questions that match a template exactly are accepted; anything with
+    extra clauses (role play, "instead of", admin claims, ...) goes to the model.
+    """
+    match = _ONE_CONTACT_RE.match(question)
+    if match:
+        user = match.group("user")
+        return ContactIntent(ONE_CONTACT_SQL, (user, match.group("target")), user)
+    match = _ALL_CONTACTS_RE.match(question)
+    if match:
+        user = match.group("user")
+        return ContactIntent(ALL_CONTACTS_SQL, (user,), user)
+    return None
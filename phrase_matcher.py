@@ -0,0 +1,159 @@
+import re
+import threading
+from collections import deque
+from phrase_store import get_phrase_store
+
+_TOKEN_RE = re.compile(r"[a-z0-9_\[\]']+")
+_QUOTES = str.maketrans({"’": "'", "‘": "'", "“": '"', "”": '"'})
+# "Hi", "I am Bob", "Hello, this is [UserName]": a greeting and/or a self-introduction,
+# the latter optionally followed by a capitalized name (or placeholder), and nothing else
+_INTRODUCTION_RE = re.compile(
+    r"\s*(?:(?i:hi|hello|hey|dear|greetings)\b[\s,.!]*)*"
+    r"(?:(?i:i\s+am|i'm|im|this\s+is|my\s+name\s+is|it's|it\s+is)\b\s*"
+    r"(?:(?:[A-Z][a-z'-]*|\[\w+\])\s*){0,3})?[\s,.!]*"
+)
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+def tokenize(text: str) -> list:
+    # Case, punctuation and runs of whitespace are all normalized away
+    return _TOKEN_RE.findall(text.translate(_QUOTES).lower())
+
+def is_introduction(phrase: str) -> bool:
+    # Says who is asking, not how they attack; such phrases must never block a question
+    return _INTRODUCTION_RE.fullmatch(phrase.translate(_QUOTES)) is not None
+
+class PhraseMatcher:
+    """Aho-Corasick automaton over word tokens.
+
+    Matching on tokens rather than characters keeps "hi" from firing inside "this".
+    Phrases shorter than `min_tokens` words (e.g. a bare "Hello") and greetings or
+    self-introductions ("Hi, I am Bob") are ignored, so ordinary questions are not
+    blocked for naming their asker. New phrases are inserted into the trie as
+    they arrive; failure links are recomputed lazily before the next match.
+    """
+
+    def __init__(self, phrases=(), min_tokens=2):
+        self.min_tokens = min_tokens
+        self._goto = [{}]
+        self._fail = [0]
+        self._own = [None]
+        self._out = [()]
+        self._phrases = []
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.add(phrases)
+
+    def __len__(self):
+        return len(self._phrases)
+
+    def add(self, phrases):
+        with self._lock:
+            for phrase in phrases:
+                tokens = tokenize(phrase)
+                if len(tokens) < self.min_tokens or is_introduction(phrase):
+                    continue
+                node = 0
+                for token in tokens:
+                    child = self._goto[node].get(token)
+                    if child is None:
+                        child = len(self._goto)
+                        self._goto[node][token] = child
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._own.append(None)
+                        self._out.append(())
+                    node = child
+                if self._own[node] is None:
+                    self._own[node] = len(self._phrases)
+                    self._phrases.append(phrase)
+                    self._dirty = True
+
+    def _build(self):
+        # Breadth-first failure links; outputs are merged along them so matching
+        # never has to walk the failure chain to report a hit.
+        goto = self._goto
+        fail = [0] * len(goto)
+        out = [() if own is None else (own,) for own in self._own]
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in goto[node].items():
+                state = fail[node]
+                while state and token not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(token, 0)
+                fail[child] = target if target != child else 0
+                out[child] = out[child] + out[fail[child]]
+                queue.append(child)
+        self._fail = fail
+        self._out = out
+        self._dirty = False
+
+    def _step(self, state, token):
+        goto, fail = self._goto, self._fail
+        while state and token not in goto[state]:
+            state = fail[state]
+        return goto[state].get(token, 0)
+
+    def find_all(self, text: str) -> list:
+        with self._lock:
+            if self._dirty:
+                self._build()
+            found = []
+            state = 0
+            for token in tokenize(text):
+                state = self._step(state, token)
+                for index in self._out[state]:
+                    found.append(self._phrases[index])
+            return list(dict.fromkeys(found))
+
+    def first_match(self, text: str):
+        with self._lock:
+            if self._dirty:
+                self._build()
+            state = 0
+            for token in tokenize(text):
+                state = self._step(state, token)
+                if self._out[state]:
+                    return self._phrases[self._out[state][0]]
+            return None
+
+class StoreMatcher:
+    """PhraseMatcher that follows a PhraseStore: appends are added incrementally,
+    anything else (e.g. phrases.txt edited by hand) triggers a full rebuild."""
+
+    def __init__(self, store, min_tokens=2):
+        self.store = store
+        self.min_tokens = min_tokens
+        self.matcher = PhraseMatcher(min_tokens=min_tokens)
+        self._reloads = None
+        self._consumed = 0
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        with self._lock:
+            reloads, new_phrases = self.store.tail(self._consumed)
+            if reloads != self._reloads:
+                reloads, new_phrases = self.store.tail(0)
+                self.matcher = PhraseMatcher(min_tokens=self.min_tokens)
+                self._reloads, self._consumed = reloads, 0
+            if new_phrases:
+                self.matcher.add(new_phrases)
+                self._consumed += len(new_phrases)
+            return self.matcher
+
+    def first_match(self, text: str):
+        return self._sync().first_match(text)
+
+    def find_all(self, text: str) -> list:
+        return self._sync().find_all(text)
+
+def get_phrase_matcher(path="phrases.txt") -> StoreMatcher:
+    store = get_phrase_store(path)
+    with _matchers_lock:
+        matcher = _matchers.get(id(store))
+        if matcher is None:
+            matcher = _matchers[id(store)] = StoreMatcher(store)
+        return matcher
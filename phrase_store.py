@@ -0,0 +1,109 @@
+import os
+import threading
+from tracing import span
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def parse_phrases(raw: str) -> list:
+    return [p.strip() for p in raw.split(",") if p.strip()]
+
+class PhraseStore:
+    """In-memory view of a comma-separated phrase file.
+
+    New phrases are appended to the file instead of rewriting it, and the file is
+    only re-read when its mtime/size no longer match what this store last saw, so
+    reads are a single stat() and adds cost O(new phrases) however large it grows.
+    `version` increases whenever the phrase set changes; `reloads` only when the
+    file was re-read from disk (anything other than our own appends).
+    """
+
+    def __init__(self, path="phrases.txt"):
+        self.path = path
+        self.version = 0
+        self.reloads = 0
+        self._phrases = []
+        self._known = set()
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _refresh(self):
+        signature = self._stat()
+        if signature == self._signature:
+            return
+        if signature is None:
+            phrases = []
+        else:
+            with open(self.path, "r", encoding="utf-8") as f:
+                phrases = list(dict.fromkeys(parse_phrases(f.read())))
+        if phrases != self._phrases:
+            self._phrases = phrases
+            self._known = set(phrases)
+            self.version += 1
+            self.reloads += 1
+        self._signature = signature
+
+    def phrases(self) -> list:
+        with self._lock:
+            self._refresh()
+            return list(self._phrases)
+
+    def current_version(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self.version
+
+    def tail(self, start=0):
+        # (reloads, phrases[start:]) so consumers can follow appends without copying everything
+        with self._lock:
+            self._refresh()
+            return self.reloads, self._phrases[start:]
+
+    def snapshot(self):
+        # (version, phrases) read together, for callers that cache derived data
+        with self._lock:
+            self._refresh()
+            return self.version, list(self._phrases)
+
+    def add(self, phrases) -> list:
+        with span("phrases.persist") as current, self._lock:
+            self._refresh()
+            new_phrases = []
+            for phrase in phrases:
+                phrase = phrase.strip()
+                if phrase and phrase not in self._known:
+                    self._known.add(phrase)
+                    new_phrases.append(phrase)
+            current.set(phrases=len(new_phrases))
+            if not new_phrases:
+                return []
+
+            text = ", ".join(new_phrases)
+            if self._phrases:
+                text = ", " + text
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(text)
+            self._phrases.extend(new_phrases)
+            self.version += 1
+
+            # Accept the new stat only if nobody else appended meanwhile; otherwise re-read next time
+            previous_size = self._signature[1] if self._signature else 0
+            signature = self._stat()
+            expected_size = previous_size + len(text.encode("utf-8"))
+            self._signature = signature if signature and signature[1] == expected_size else None
+            return new_phrases
+
+def get_phrase_store(path="phrases.txt") -> PhraseStore:
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = PhraseStore(path)
+        return store
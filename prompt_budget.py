@@ -0,0 +1,69 @@
+import re
+import threading
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+# Running totals across every attacker prompt built in this process
+budget_stats = {"calls": 0, "tokens_before": 0, "tokens_after": 0, "dropped_duplicates": 0, "dropped_over_budget": 0}
+_stats_lock = threading.Lock()
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English; good enough for budgeting, no tokenizer needed
+    return max(1, (len(text) + 3) // 4)
+
+def _shingles(text: str) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < 3:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+def _similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def select_refused_prompts(refused_prompts, token_budget=600, duplicate_threshold=0.6):
+    """Pick which refused prompts go into the attacker prompt.
+
+    Walks from newest to oldest, skipping near-duplicates (word-trigram Jaccard
+    similarity above `duplicate_threshold`) of prompts already kept, and stops
+    adding once `token_budget` is used. Returns the kept prompts in their original
+    order plus a stats dict; `tokens_saved` is what the full list would have cost extra.
+    """
+    kept = []
+    kept_shingles = []
+    used = 0
+    dropped_duplicates = 0
+    dropped_over_budget = 0
+    total = 0
+
+    for prompt in reversed(refused_prompts):
+        cost = estimate_tokens(prompt)
+        total += cost
+        shingles = _shingles(prompt)
+        if any(_similarity(shingles, other) >= duplicate_threshold for other in kept_shingles):
+            dropped_duplicates += 1
+            continue
+        if used + cost > token_budget:
+            dropped_over_budget += 1
+            continue
+        kept.append(prompt)
+        kept_shingles.append(shingles)
+        used += cost
+
+    kept.reverse()
+    stats = {
+        "kept": len(kept),
+        "dropped_duplicates": dropped_duplicates,
+        "dropped_over_budget": dropped_over_budget,
+        "tokens_before": total,
+        "tokens_after": used,
+        "tokens_saved": total - used,
+    }
+    with _stats_lock:
+        budget_stats["calls"] += 1
+        budget_stats["tokens_before"] += total
+        budget_stats["tokens_after"] += used
+        budget_stats["dropped_duplicates"] += dropped_duplicates
+        budget_stats["dropped_over_budget"] += dropped_over_budget
+    return kept, stats
@@ -0,0 +1,173 @@
+import re
+import threading
+import zlib
+from phrase_matcher import tokenize
+from phrase_store import get_phrase_store
+from sql_authorizer import claimed_user_name
+
+EMBEDDING_DIM = 1024
+# Cosine similarity above which a prompt reuses a tested neighbour's verdict
+NEAR_DUPLICATE_SIMILARITY = 0.92
+# Neighbours checked for one that also names the same people
+NEAR_DUPLICATE_CANDIDATES = 5
+_NAME_RE = re.compile(r"\b[A-Z][a-zA-Z'-]+\b")
+
+_prompt_index = None
+_prompt_index_lock = threading.Lock()
+
+# faiss and numpy are imported on first use: most CLI runs never build an index
+def _hashed_features(texts, dim):
+    import numpy as np
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        features = tokens + [a + " " + b for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vectors[row, h % dim] += 1.0 if h & 0x80000000 else -1.0
+    return vectors
+
+def embed(texts, dim=EMBEDDING_DIM):
+    """Signed feature hashing of word unigrams and bigrams, L2-normalized.
+
+    Works offline and is stable across processes (crc32, not Python's salted hash),
+    so inner products in a FAISS IndexFlatIP are cosine similarities.
+    """
+    import faiss
+    vectors = _hashed_features(texts, dim)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def prompt_entities(prompt):
+    # The claimed user and every capitalized name: what decides a verdict, whatever the wording
+    return claimed_user_name(prompt), frozenset(_NAME_RE.findall(prompt))
+
+class PromptIndex:
+    """Every prompt sent to the manager, with its verdict, in a FAISS inner-product index.
+
+    Each entry keeps the phrase store version it was tested against: once mined
+    phrases change, the manager may answer the same prompt differently.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        import faiss
+        self.dim = dim
+        self.index = faiss.IndexFlatIP(dim)
+        self.prompts = []
+        self.verdicts = []
+        self.versions = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.prompts)
+
+    def add(self, prompt: str, verdict: str, version=None):
+        vector = embed([prompt], self.dim)
+        with self._lock:
+            self.index.add(vector)
+            self.prompts.append(prompt)
+            self.verdicts.append(verdict)
+            self.versions.append(version)
+
+    def _search(self, prompt, k):
+        vector = embed([prompt], self.dim)
+        with self._lock:
+            if not self.prompts:
+                return []
+            scores, ids = self.index.search(vector, min(k, len(self.prompts)))
+            return [(float(s), self.prompts[i], self.verdicts[i], self.versions[i])
+                    for s, i in zip(scores[0], ids[0]) if i >= 0]
+
+    def search(self, prompt: str, k=5) -> list:
+        # [(similarity, prompt, verdict)], most similar first
+        return [hit[:3] for hit in self._search(prompt, k)]
+
+    def reusable(self, prompt: str, version, threshold=NEAR_DUPLICATE_SIMILARITY, k=NEAR_DUPLICATE_CANDIDATES):
+        # The closest near-duplicate tested at `version` that names the same user and
+        # contacts, as (similarity, prompt, verdict), or None
+        entities = prompt_entities(prompt)
+        return next((
+            hit[:3] for hit in self._search(prompt, k)
+            if hit[0] >= threshold and hit[3] == version and prompt_entities(hit[1]) == entities
+        ), None)
+
+    def nearest(self, prompt: str):
+        hits = self.search(prompt, k=1)
+        return hits[0] if hits else None
+
+class PhraseIndex:
+    """Mined phrases from a PhraseStore in a FAISS index, scored by containment.
+
+    Phrase vectors are divided by their squared norm and queries are clipped to
+    +/-1 per feature, so a score is roughly the fraction of a phrase's words and
+    word pairs that occur in the question: 1.0 means the phrase is fully present,
+    however long the question is. Follows the store like StoreMatcher does.
+    """
+
+    def __init__(self, store, dim=EMBEDDING_DIM):
+        import faiss
+        self.store = store
+        self.dim = dim
+        self.index = faiss.IndexFlatIP(dim)
+        self.phrases = []
+        self.token_counts = []
+        self._reloads = None
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        import faiss
+        import numpy as np
+        reloads, new_phrases = self.store.tail(len(self.phrases))
+        if reloads != self._reloads:
+            reloads, new_phrases = self.store.tail(0)
+            self.index = faiss.IndexFlatIP(self.dim)
+            self.phrases, self.token_counts = [], []
+            self._reloads = reloads
+        if new_phrases:
+            vectors = _hashed_features(new_phrases, self.dim)
+            norms = (vectors * vectors).sum(axis=1, keepdims=True)
+            self.index.add(vectors / np.maximum(norms, 1.0))
+            self.phrases.extend(new_phrases)
+            self.token_counts.extend(len(tokenize(p)) for p in new_phrases)
+
+    def search(self, question: str, k=8) -> list:
+        # [(score, phrase, token_count)], best first
+        import numpy as np
+        query = np.clip(_hashed_features([question], self.dim), -1.0, 1.0)
+        with self._lock:
+            self._sync()
+            if not self.phrases:
+                return []
+            scores, ids = self.index.search(query, min(k, len(self.phrases)))
+            return [(float(s), self.phrases[i], self.token_counts[i]) for s, i in zip(scores[0], ids[0]) if i >= 0]
+
+_phrase_indexes = {}
+
+def get_phrase_index(path="phrases.txt") -> PhraseIndex:
+    store = get_phrase_store(path)
+    with _prompt_index_lock:
+        index = _phrase_indexes.get(id(store))
+        if index is None:
+            index = _phrase_indexes[id(store)] = PhraseIndex(store)
+        return index
+
+def get_prompt_index() -> PromptIndex:
+    global _prompt_index
+    if _prompt_index is None:
+        with _prompt_index_lock:
+            if _prompt_index is None:
+                _prompt_index = PromptIndex()
+    return _prompt_index
+
+def evaluate_reusing(prompt: str, evaluate, path="phrases.txt") -> dict:
+    # evaluate(prompt) plus "reused": a near-duplicate of a prompt tested against the same
+    # phrase set takes its verdict from the index instead of another manager call
+    version = (path, get_phrase_store(path).current_version())
+    index = get_prompt_index()
+    neighbour = index.reusable(prompt, version)
+    if neighbour:
+        return {"verdict": neighbour[2], "sql": None, "source": "reused", "reused": True}
+    result = dict(evaluate(prompt), reused=False)
+    if result["verdict"] != "ERROR":
+        index.add(prompt, result["verdict"], version)
+    return result
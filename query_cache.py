@@ -0,0 +1,171 @@
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from sql_authorizer import execute_authorized, get_authorized_connection, unrestricted_row_count
+from tracing import span
+
+# String literals, and numbers right after a comparison operator, become bound parameters.
+# Other numbers (ORDER BY 1, LIMIT 5, ...) are left alone because binding them changes meaning.
+# Comments collapse to a space like any other whitespace.
+_LITERAL_RE = re.compile(
+    r"(?P<comment>--[^\n]*|/\*[\s\S]*?\*/)"
+    r"|(?P<string>(?<![\w$])'(?:[^']|'')*')"
+    r"|(?P<op>(?:<=|>=|!=|<>|==|=|<|>)\s*)(?P<number>-?\d+(?:\.\d+)?)(?![\w.])"
+    r"|(?P<quoted>\"(?:[^\"]|\"\")*\")"
+    r"|(?P<space>\s+)"
+)
+_ALIAS_RE = re.compile(r"\bas\s*$", re.IGNORECASE)
+
+def normalize_sql(sql: str):
+    """(template, params): the statement with its literals replaced by `?`.
+
+    Different literal values share one template string, so they also share one
+    compiled statement in sqlite3's per-connection statement cache.
+    """
+    out = []
+    params = []
+    pos = 0
+    for match in _LITERAL_RE.finditer(sql):
+        out.append(sql[pos:match.start()])
+        pos = match.end()
+        if match.group("string") is not None:
+            if _ALIAS_RE.search("".join(out)):
+                out.append(match.group("string"))
+            else:
+                out.append("?")
+                params.append(match.group("string")[1:-1].replace("''", "'"))
+        elif match.group("number") is not None:
+            number = match.group("number")
+            out.append(match.group("op") + "?")
+            params.append(float(number) if "." in number else int(number))
+        elif match.group("quoted") is not None:
+            out.append(match.group("quoted"))
+        else:
+            out.append(" ")
+    out.append(sql[pos:])
+    template = "".join(out).strip().rstrip(";").strip()
+    return template, tuple(params)
+
+class QueryResultCache:
+    """LRU of query results per (database, claimed user, template, params).
+
+    The pooled connections are read-only, so any change comes from another
+    connection. It moves the size or mtime of the database file or its -wal,
+    which every lookup compares with the last one seen by any thread, and it
+    moves a connection's PRAGMA data_version (which catches writes within one
+    mtime tick). Either bumps `generation`, which drops every entry; results
+    read under an older generation are never stored.
+    """
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._signatures = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @staticmethod
+    def file_signature(db_name):
+        # (mtime_ns, size) of the database and its -wal; process-wide, unlike data_version
+        path = os.path.realpath(db_name)
+        signature = []
+        for name in (path, path + "-wal"):
+            try:
+                st = os.stat(name)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def check_generation(self, conn, db_name):
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        seen = getattr(self._local, "data_versions", None)
+        if seen is None:
+            seen = self._local.data_versions = {}
+        previous = seen.get(db_name)
+        seen[db_name] = data_version
+        signature = self.file_signature(db_name)
+        with self._lock:
+            changed = previous is not None and previous != data_version
+            changed |= self._signatures.setdefault(db_name, signature) != signature
+            if changed:
+                self._signatures[db_name] = signature
+                self.generation += 1
+                self._entries.clear()
+            return self.generation
+
+    def get(self, key):
+        with self._lock:
+            rows = self._entries.get(key)
+            if rows is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rows
+
+    def put(self, key, rows, generation):
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = rows
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "generation": self.generation}
+
+result_cache = QueryResultCache()
+
+def execute_cached(sql: str, db_name: str, user_name=None, params=()) -> list:
+    # Generated SQL (no params) is normalized into a template first; already
+    # parameterized queries are used as given
+    with span("sql.execute") as current:
+        conn = get_authorized_connection(db_name)
+        generation = result_cache.check_generation(conn, db_name)
+        template, bound = (sql, tuple(params)) if params else normalize_sql(sql)
+        key = (db_name, (user_name or "").lower(), template, bound)
+
+        rows = result_cache.get(key)
+        current.set(cache_hit=rows is not None)
+        if rows is not None:
+            current.set(rows=len(rows))
+            return list(rows)
+        try:
+            rows = execute_authorized(template, db_name, user_name, bound)
+        except sqlite3.Error:
+            if template == sql:
+                raise
+            # Normalization should never change meaning, but if it did, the original text decides
+            rows = execute_authorized(sql, db_name, user_name, params)
+        result_cache.put(key, tuple(rows), generation)
+        current.set(rows=len(rows))
+        return rows
+
+def count_unrestricted_cached(sql: str, db_name: str, params=()) -> int:
+    # unrestricted_row_count(), cached with the same template, params and generation as the
+    # rows, so a repeated model query costs no second scan of the unrestricted tables
+    with span("sql.unrestricted_count") as current:
+        generation = result_cache.check_generation(get_authorized_connection(db_name), db_name)
+        template, bound = (sql, tuple(params)) if params else normalize_sql(sql)
+        key = (db_name, None, template, bound)
+
+        count = result_cache.get(key)
+        current.set(cache_hit=count is not None)
+        if count is not None:
+            return count
+        try:
+            count = unrestricted_row_count(template, db_name, bound)
+        except sqlite3.Error:
+            if template == sql:
+                raise
+            count = unrestricted_row_count(sql, db_name, params)
+        result_cache.put(key, count, generation)
+        return count
@@ -0,0 +1,109 @@
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from db_pool import get_connection, open_readonly
+
+# Statements generated SQL may prepare; everything else (writes, PRAGMA, ATTACH, ...) is denied
+_ALLOWED_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+_CLAIM_RE = re.compile(r"\b(?:I am|I'm|I’m|this is|my name is)\s+([A-Z][a-zA-Z'-]+(?:\s+[A-Z][a-zA-Z'-]+)?)")
+
+_local = threading.local()
+
+def claimed_user_name(question: str):
+    # The first "I am <Name>" in the question is the identity the query runs as
+    match = _CLAIM_RE.search(question or "")
+    return match.group(1) if match else None
+
+def _current_user_id():
+    return getattr(_local, "user_id", None)
+
+def _authorize(action, arg1, arg2, db_name, source):
+    if action == sqlite3.SQLITE_PRAGMA and (arg1 or "").lower() == "data_version" and arg2 is None:
+        return sqlite3.SQLITE_OK  # read-only change counter used by the query result cache
+    if action not in _ALLOWED_ACTIONS:
+        return sqlite3.SQLITE_DENY
+    # Contacts rows are only reachable through the temp.contacts view, which filters
+    # on the claimed user; naming main.contacts directly is rejected at prepare time.
+    if action == sqlite3.SQLITE_READ and arg1 == "contacts" and db_name == "main" and source != "contacts":
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+def install_authorization(conn: sqlite3.Connection):
+    """Confine `conn` to the claimed user's contacts.
+
+    A TEMP view named `contacts` shadows main.contacts for every unqualified
+    reference and keeps only rows whose user_id is the claimed one, so generated
+    queries are rewritten in effect without parsing them. The authorizer then
+    rejects anything that is not a read and any direct read of main.contacts.
+    """
+    conn.create_function("current_user_id", 0, _current_user_id)
+    conn.execute("PRAGMA query_only = OFF")  # temp schema only; main is opened mode=ro
+    try:
+        conn.execute(
+            "CREATE TEMP VIEW IF NOT EXISTS contacts AS "
+            "SELECT * FROM main.contacts WHERE user_id = current_user_id()"
+        )
+    finally:
+        conn.execute("PRAGMA query_only = ON")
+    conn.set_authorizer(_authorize)
+
+def get_authorized_connection(db_name: str) -> sqlite3.Connection:
+    conn = get_connection(db_name)
+    installed = getattr(_local, "installed", None)
+    if installed is None:
+        installed = _local.installed = {}
+    if installed.get(db_name) is not conn:
+        install_authorization(conn)
+        installed[db_name] = conn
+    return conn
+
+def resolve_user_id(conn: sqlite3.Connection, user_name):
+    if not user_name:
+        return None
+    row = conn.execute("SELECT user_id FROM users WHERE name = ? COLLATE NOCASE", (user_name,)).fetchone()
+    return row[0] if row else None
+
+@contextmanager
+def claimed_user(user_id):
+    previous = getattr(_local, "user_id", None)
+    _local.user_id = user_id
+    try:
+        yield
+    finally:
+        _local.user_id = previous
+
+def execute_authorized(sql: str, db_name: str, user_name=None, params=()) -> list:
+    # Runs generated SQL as `user_name`; with no (known) user no contacts are visible at all
+    conn = get_authorized_connection(db_name)
+    with claimed_user(resolve_user_id(conn, user_name)):
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+def _authorize_reads(action, arg1, arg2, db_name, source):
+    return sqlite3.SQLITE_OK if action in _ALLOWED_ACTIONS else sqlite3.SQLITE_DENY
+
+def is_denied(error: Exception) -> bool:
+    # How sqlite3 reports an authorizer denial at prepare time: for a statement, or for a column read
+    message = str(error)
+    return isinstance(error, sqlite3.DatabaseError) and ("not authorized" in message or "is prohibited" in message)
+
+def unrestricted_row_count(sql: str, db_name: str, params=()) -> int:
+    """Rows `sql` returns without the contacts view, counted on a separate read-only connection.
+
+    When it differs from the authorized result, enforcement rather than the query
+    itself decided what the claimed user got to see.
+    """
+    connections = getattr(_local, "unrestricted", None)
+    if connections is None:
+        connections = _local.unrestricted = {}
+    conn = connections.get(db_name)
+    if conn is None:
+        conn = connections[db_name] = open_readonly(db_name)
+        conn.set_authorizer(_authorize_reads)
+    body = sql.strip().rstrip(";")
+    return conn.execute(f"SELECT COUNT(*) FROM (\n{body}\n)", params).fetchone()[0]
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_sql_cache = None
+_sql_cache_lock = threading.Lock()
+
+class SQLCache:
+    """Content-addressed cache of generated SQL.
+
+    Keys hash the model name, the system prompt and the question, so any change to
+    the system prompt (e.g. new phrases in phrases.txt) misses naturally. Entries
+    live in an in-memory LRU with a TTL and, when `disk_path` is set, in an SQLite
+    table that survives restarts and is shared between processes.
+    """
+
+    def __init__(self, max_entries=4096, ttl=24 * 3600, disk_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._disk = None
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS sql_cache (key TEXT PRIMARY KEY, sql TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._disk.commit()
+
+    @staticmethod
+    def make_key(model_name: str, system_prompt: str, question: str) -> str:
+        payload = json.dumps([model_name, system_prompt, question], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                sql, created = entry
+                if not self._expired(created):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return sql
+                del self._entries[key]
+            if self._disk is not None:
+                row = self._disk.execute("SELECT sql, created FROM sql_cache WHERE key = ?", (key,)).fetchone()
+                if row and not self._expired(row[1]):
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, sql):
+        created = time.time()
+        with self._lock:
+            self._remember(key, sql, created)
+            if self._disk is not None:
+                self._disk.execute("INSERT OR REPLACE INTO sql_cache VALUES (?, ?, ?)", (key, sql, created))
+                self._disk.commit()
+
+    def _remember(self, key, sql, created):
+        self._entries[key] = (sql, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_generate(self, model_name, system_prompt, question, generate):
+        # Concurrent misses on one key share a single generate() call
+        key = self.make_key(model_name, system_prompt, question)
+        sql = self.get(key)
+        if sql is not None:
+            return sql
+        with self._lock:
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._inflight[key] = {"done": threading.Event(), "sql": None, "error": None}
+        if not leader:
+            pending["done"].wait()
+            if pending["error"] is not None:
+                raise pending["error"]
+            with self._lock:
+                self.coalesced += 1
+            return pending["sql"]
+        try:
+            sql = pending["sql"] = generate()
+            self.put(key, sql)
+            return sql
+        except BaseException as e:
+            pending["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            pending["done"].set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM sql_cache")
+                self._disk.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+def get_sql_cache() -> SQLCache:
+    # Configured from SQL_CACHE_SIZE, SQL_CACHE_TTL (seconds) and SQL_CACHE_PATH (disk tier)
+    global _sql_cache
+    if _sql_cache is None:
+        with _sql_cache_lock:
+            if _sql_cache is None:
+                _sql_cache = SQLCache(
+                    max_entries=int(os.getenv("SQL_CACHE_SIZE", "4096")),
+                    ttl=float(os.getenv("SQL_CACHE_TTL", str(24 * 3600))),
+                    disk_path=os.getenv("SQL_CACHE_PATH") or None,
+                )
+    return _sql_cache
@@ -0,0 +1,49 @@
+import re
+import threading
+
+# Anything that can never be part of an acceptable manager answer, outside quotes and comments
+# (replace() is a string function; the read-only connection and authorizer stop REPLACE INTO)
+_FORBIDDEN_RE = re.compile(
+    r"`|\b(?:delete|drop|insert|update|alter|create|attach|detach|pragma|vacuum|reindex)\b",
+    re.IGNORECASE,
+)
+# Like query_cache._LITERAL_RE, but a literal or comment still open at the end of the prefix counts too
+_QUOTED_RE = re.compile(r"'(?:[^']|'')*(?:'|$)|\"(?:[^\"]|\"\")*(?:\"|$)|--[^\n]*|/\*[\s\S]*?(?:\*/|$)")
+
+stream_stats = {"completed": 0, "aborted": 0}
+_stats_lock = threading.Lock()
+
+class SQLStreamAborted(ValueError):
+    def __init__(self, reason: str, prefix: str):
+        super().__init__(f"{reason}: {prefix[:80]!r}")
+        self.reason = reason
+        self.prefix = prefix
+
+def check_sql_prefix(prefix: str):
+    """Reason the text so far can no longer become an acceptable SELECT, or None."""
+    head = prefix.lstrip().lower()
+    if head and not (head.startswith("select") or "select".startswith(head)):
+        return "not a SELECT statement"
+    match = _FORBIDDEN_RE.search(_QUOTED_RE.sub(" ", prefix))
+    if match:
+        return f"forbidden token {match.group(0)!r}"
+    return None
+
+def collect_sql(chunks) -> str:
+    # Consumes a chunk stream, closing it as soon as the prefix fails check_sql_prefix
+    parts = []
+    try:
+        for chunk in chunks:
+            parts.append(chunk)
+            prefix = "".join(parts)
+            reason = check_sql_prefix(prefix)
+            if reason:
+                with _stats_lock:
+                    stream_stats["aborted"] += 1
+                raise SQLStreamAborted(reason, prefix)
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+    with _stats_lock:
+        stream_stats["completed"] += 1
+    return "".join(parts)
@@ -0,0 +1,116 @@
+import json
+import re
+import threading
+from collections import Counter
+
+# JSON schema requested from the attacker model (response_mime_type=application/json)
+STRATEGY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "strategies": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "strategy": {"type": "integer"},
+                    "prompt": {"type": "string"},
+                },
+                "required": ["strategy", "prompt"],
+            },
+        },
+    },
+    "required": ["strategies"],
+}
+
+STRATEGY_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": STRATEGY_SCHEMA}
+
+_PROMPT_LINE_RE = re.compile(r"^[\s*#>-]*prompt\s*\d*\s*\**\s*:\s*\**\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE)
+_PROMPT_FIELD_RE = re.compile(r'"prompt"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+# How each attacker answer was parsed; failures are also counted per iteration
+parse_metrics = {"json": 0, "stream": 0, "regex": 0, "failed": 0, "failures_by_iteration": Counter()}
+_metrics_lock = threading.Lock()
+
+def _clean(prompt):
+    prompt = str(prompt).strip()
+    if len(prompt) >= 2 and prompt[0] == prompt[-1] and prompt[0] in "\"'“”":
+        prompt = prompt[1:-1].strip()
+    return prompt
+
+class StrategyStreamParser:
+    """Incremental parser that emits each strategy prompt as soon as its JSON object closes.
+
+    It tracks brace depth outside of string literals, so surrounding prose, code
+    fences and a truncated tail do not stop earlier objects from being recovered.
+    """
+
+    def __init__(self):
+        self.prompts = []
+        self._buffer = []
+        self._depth = 0
+        self._starts = []
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> list:
+        emitted = []
+        for ch in chunk:
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._starts.append(len(self._buffer) - 1)
+                self._depth += 1
+            elif ch == "}" and self._depth:
+                self._depth -= 1
+                start = self._starts.pop()
+                try:
+                    obj = json.loads("".join(self._buffer[start:]))
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(obj, dict) and isinstance(obj.get("prompt"), str) and obj["prompt"].strip():
+                    prompt = _clean(obj["prompt"])
+                    self.prompts.append(prompt)
+                    emitted.append(prompt)
+        return emitted
+
+def parse_strategy_output(text: str):
+    """(prompts, method) with method one of "json", "stream", "regex" or "failed"."""
+    stripped = re.sub(r"^\s*```(?:json)?\s*|\s*```\s*$", "", text.strip())
+    try:
+        data = json.loads(stripped)
+        items = data.get("strategies") if isinstance(data, dict) else data
+        prompts = [_clean(item["prompt"]) for item in items if isinstance(item, dict) and str(item.get("prompt", "")).strip()]
+        if prompts:
+            return prompts, "json"
+    except (json.JSONDecodeError, TypeError, AttributeError):
+        pass
+
+    parser = StrategyStreamParser()
+    parser.feed(text)
+    if parser.prompts:
+        return parser.prompts, "stream"
+
+    prompts = [_clean(p) for p in _PROMPT_LINE_RE.findall(text)]
+    for field in _PROMPT_FIELD_RE.findall(text):
+        try:
+            prompts.append(_clean(json.loads(f'"{field}"')))
+        except json.JSONDecodeError:
+            prompts.append(_clean(field))
+    prompts = [p for p in dict.fromkeys(prompts) if p]
+    if prompts:
+        return prompts, "regex"
+    return [], "failed"
+
+def record_parse(method: str, iteration=None):
+    with _metrics_lock:
+        parse_metrics[method] += 1
+        if method == "failed" and iteration is not None:
+            parse_metrics["failures_by_iteration"][iteration] += 1
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from llm_backend import CircuitBreaker, CircuitOpenError, ResilientBackend, StubBackend, TransientError, TransportError
+from sql_stream import SQLStreamAborted, collect_sql
+
+MODEL = "test-model"
+
+class Script:
+    # Responder raising or answering from a list of outcomes, then answering `default`
+    def __init__(self, *outcomes, default="SELECT 1"):
+        self.outcomes = list(outcomes)
+        self.default = default
+        self.calls = 0
+
+    def __call__(self, parts):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else self.default
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+def resilient(script, threshold=2, reset_timeout=0.05, max_attempts=1):
+    return ResilientBackend(
+        StubBackend(responders={MODEL: script}, chunk_size=4),
+        breaker=CircuitBreaker(threshold=threshold, reset_timeout=reset_timeout),
+        max_attempts=max_attempts, base_delay=0.001,
+    )
+
+def open_circuit(backend):
+    for _ in range(backend.breaker.threshold):
+        with pytest.raises(TransportError):
+            backend.generate(MODEL, ["q"])
+    with pytest.raises(CircuitOpenError):
+        backend.generate(MODEL, ["q"])
+    time.sleep(backend.breaker.reset_timeout * 1.5)
+
+def test_transient_errors_are_retried():
+    script = Script(TransientError("503"), TransientError("503"))
+    backend = resilient(script, threshold=5, max_attempts=3)
+    assert backend.generate(MODEL, ["q"]) == "SELECT 1"
+    assert script.calls == 3
+    assert backend.stats()["retries"] == 2
+
+def test_non_transient_errors_are_not_retried():
+    script = Script(ValueError("invalid API key"))
+    backend = resilient(script, max_attempts=3)
+    with pytest.raises(TransportError):
+        backend.generate(MODEL, ["q"])
+    assert script.calls == 1
+
+def test_successful_trial_closes_the_circuit():
+    backend = resilient(Script(TransientError("503"), TransientError("503")))
+    open_circuit(backend)
+    assert backend.generate(MODEL, ["q"]) == "SELECT 1"
+    assert backend.generate(MODEL, ["q"]) == "SELECT 1"
+
+def test_failed_trial_reopens_the_circuit():
+    backend = resilient(Script(TransientError("503"), TransientError("503"), TransientError("503")))
+    open_circuit(backend)
+    with pytest.raises(TransportError):
+        backend.generate(MODEL, ["q"])
+    with pytest.raises(CircuitOpenError):
+        backend.generate(MODEL, ["q"])
+
+def test_non_transient_trial_settles_the_circuit():
+    backend = resilient(Script(TransientError("503"), TransientError("503"), ValueError("bad request")))
+    open_circuit(backend)
+    with pytest.raises(TransportError):
+        backend.generate(MODEL, ["q"])
+    assert backend.generate(MODEL, ["q"]) == "SELECT 1"
+
+def test_trial_stream_closed_by_the_consumer_settles_the_circuit():
+    backend = resilient(Script(TransientError("503"), TransientError("503"), "Sure, here is the query you asked for"))
+    open_circuit(backend)
+    with pytest.raises(SQLStreamAborted):
+        collect_sql(backend.generate_stream(MODEL, ["q"]))
+    assert collect_sql(backend.generate_stream(MODEL, ["q"])) == "SELECT 1"
+
+def test_trial_stream_with_non_transient_error_settles_the_circuit():
+    backend = resilient(Script(TransientError("503"), TransientError("503"), ValueError("bad request")))
+    open_circuit(backend)
+    with pytest.raises(TransportError):
+        collect_sql(backend.generate_stream(MODEL, ["q"]))
+    assert collect_sql(backend.generate_stream(MODEL, ["q"])) == "SELECT 1"
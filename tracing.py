@@ -0,0 +1,218 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the Prometheus duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Attributes summed per stage; cache_hit is counted as hits and misses
+COUNTERS = ("prompt_tokens", "response_tokens", "rows", "phrases")
+
+_local = threading.local()
+_tracer = None
+_tracer_lock = threading.Lock()
+
+def percentile(ordered, q):
+    # Nearest-rank percentile of an already sorted list
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered), max(1, math.ceil(q / 100 * len(ordered)))) - 1]
+
+class Span:
+    __slots__ = ("name", "parent", "start", "duration", "attrs", "error")
+
+    def __init__(self, name, parent, attrs):
+        self.name = name
+        self.parent = parent
+        self.start = time.time()
+        self.duration = 0.0
+        self.attrs = attrs
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.attrs[key] = self.attrs.get(key, 0) + value
+
+    def to_dict(self) -> dict:
+        record = {"name": self.name, "start": round(self.start, 6), "duration_ms": round(self.duration * 1000, 3)}
+        if self.parent:
+            record["parent"] = self.parent
+        if self.error:
+            record["error"] = self.error
+        record.update(self.attrs)
+        return record
+
+class _StageStats:
+    __slots__ = ("count", "seconds", "errors", "buckets", "counters", "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.errors = 0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+class Tracer:
+    """Aggregates finished spans per stage and optionally appends each one to a JSONL file.
+
+    Aggregates are what the Prometheus text exposes; the JSONL log and the
+    `recent` ring buffer keep individual spans for offline analysis.
+    """
+
+    def __init__(self, jsonl_path=None, keep_recent=1000):
+        self.jsonl_path = jsonl_path
+        self.recent = deque(maxlen=keep_recent)
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._file = open(jsonl_path, "a", encoding="utf-8") if jsonl_path else None
+
+    def record(self, span: Span):
+        with self._lock:
+            stats = self._stages.get(span.name)
+            if stats is None:
+                stats = self._stages[span.name] = _StageStats()
+            stats.count += 1
+            stats.seconds += span.duration
+            stats.errors += span.error is not None
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    stats.buckets[i] += 1
+                    break
+            for key in COUNTERS:
+                stats.counters[key] += span.attrs.get(key, 0)
+            if "cache_hit" in span.attrs:
+                if span.attrs["cache_hit"]:
+                    stats.cache_hits += 1
+                else:
+                    stats.cache_misses += 1
+            self.recent.append(span)
+            if self._file is not None:
+                self._file.write(json.dumps(span.to_dict(), ensure_ascii=False) + "\n")
+                self._file.flush()
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "count": s.count,
+                    "seconds": round(s.seconds, 6),
+                    "mean_ms": round(s.seconds / s.count * 1000, 3) if s.count else 0.0,
+                    "errors": s.errors,
+                    "cache_hits": s.cache_hits,
+                    "cache_misses": s.cache_misses,
+                    **s.counters,
+                }
+                for name, s in sorted(self._stages.items())
+            }
+
+    def export_jsonl(self, path):
+        # Writes the spans still held in `recent`
+        with self._lock:
+            spans = list(self.recent)
+        with open(path, "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False) + "\n")
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            stages = sorted(self._stages.items())
+            lines.append("# HELP pipeline_span_seconds Duration of pipeline stages.")
+            lines.append("# TYPE pipeline_span_seconds histogram")
+            for name, s in stages:
+                cumulative = 0
+                for bound, n in zip(DURATION_BUCKETS, s.buckets):
+                    cumulative += n
+                    lines.append(f'pipeline_span_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'pipeline_span_seconds_bucket{{stage="{name}",le="+Inf"}} {s.count}')
+                lines.append(f'pipeline_span_seconds_sum{{stage="{name}"}} {s.seconds:.6f}')
+                lines.append(f'pipeline_span_seconds_count{{stage="{name}"}} {s.count}')
+            totals = [
+                ("errors", "Spans that ended with an exception.", lambda s: s.errors),
+                ("cache_hits", "Spans answered from a cache.", lambda s: s.cache_hits),
+                ("cache_misses", "Spans that missed their cache.", lambda s: s.cache_misses),
+            ] + [(key, f"Estimated {key.replace('_', ' ')}.", lambda s, key=key: s.counters[key]) for key in COUNTERS]
+            for metric, help_text, value in totals:
+                lines.append(f"# HELP pipeline_{metric}_total {help_text}")
+                lines.append(f"# TYPE pipeline_{metric}_total counter")
+                for name, s in stages:
+                    lines.append(f'pipeline_{metric}_total{{stage="{name}"}} {value(s)}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self.recent.clear()
+
+def get_tracer() -> Tracer:
+    # TRACE_PATH appends every span as JSONL; TRACE_METRICS_PORT serves /metrics
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer(os.getenv("TRACE_PATH") or None)
+                port = os.getenv("TRACE_METRICS_PORT")
+                if port:
+                    serve_metrics(int(port), _tracer)
+    return _tracer
+
+@contextmanager
+def span(name: str, **attrs):
+    """Times the block as stage `name`; nested spans record the enclosing one as parent."""
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    current = Span(name, stack[-1].name if stack else None, attrs)
+    stack.append(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - start
+        stack.pop()
+        get_tracer().record(current)
+
+def current_span():
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+def annotate(**counts):
+    # Adds counts (e.g. tokens) to the innermost open span of this thread, if any
+    current = current_span()
+    if current is not None:
+        current.add(**counts)
+
+def serve_metrics(port: int, tracer=None, host="127.0.0.1"):
+    """Serve `tracer`'s Prometheus text at /metrics from a daemon thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    tracer = tracer or get_tracer()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = tracer.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -1,46 +1,47 @@
-import os
 import sqlite3
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-load_dotenv()  # Load all environment variables
-
-# Configure GenAI Key
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
-def get_gemini_response(question: str, prompt_list: list) -> str:
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    response = model.generate_content([prompt_list[0], question])
-    return response.text
-
-def read_sql_query(sql: str, db_name: str):
-    conn = sqlite3.connect(db_name)
-    cur = conn.cursor()
-    try:
-        cur.execute(sql)
-        rows = cur.fetchall()
-    except sqlite3.Error as ex:
-        conn.rollback()
-        conn.close()
-        raise ex
-    conn.commit()
-    conn.close()
-
-    if not rows:
-        return [("Unauthorized access. You can only view your own contacts.",)]
-    return rows
+import manager_core
+from intent_parser import parse_intent
+from llm_backend import TransportError
+from manager_core import get_gemini_response, is_unauthorized, read_sql_query
+from phrase_matcher import get_phrase_matcher, is_introduction
+from phrase_store import get_phrase_store
+from prompt_index import get_phrase_index
+from sql_authorizer import claimed_user_name
+from sql_stream import SQLStreamAborted
 
 def load_dynamic_phrases():
-    try:
-        with open("phrases.txt", "r") as f:
-            raw = f.read()
-            phrases = [p.strip() for p in raw.split(",") if p.strip()]
-            return phrases
-    except FileNotFoundError:
-        return []
-
-def build_sql_prompt():
-    dynamic_phrases = load_dynamic_phrases()
+    return get_phrase_store("phrases.txt").phrases()
+
+# Rendered prompt for the phrase-store version it was built from
+_sql_prompt_cache = {"version": None, "prompt": None}
+
+# Phrases listed per question, and the containment score that blocks a question outright
+TOP_K_PHRASES = 8
+MIN_PHRASE_RELEVANCE = 0.3
+BLOCK_SIMILARITY = 0.8
+
+def match_phrases(question: str):
+    # (blocking phrase or None, relevant phrases) from the vector index of mined phrases.
+    # Only phrases of 3+ words may block, so "Hi" or "I am" alone never refuse a question,
+    # and greetings or self-introductions ("Hi, I am Bob") are never listed or block at all.
+    hits = [hit for hit in get_phrase_index("phrases.txt").search(question, TOP_K_PHRASES) if not is_introduction(hit[1])]
+    blocking = next((p for score, p, n_tokens in hits if score >= BLOCK_SIMILARITY and n_tokens >= 3), None)
+    return blocking, [p for score, p, _ in hits if score >= MIN_PHRASE_RELEVANCE]
+
+def build_sql_prompt(question=None):
+    # With a question only its top-k relevant phrases are listed, keeping the prompt a
+    # constant size; without one every mined phrase is (cached until the set changes).
+    if question is not None:
+        return render_sql_prompt(match_phrases(question)[1])
+    store = get_phrase_store("phrases.txt")
+    if _sql_prompt_cache["version"] == store.current_version():
+        return list(_sql_prompt_cache["prompt"])
+    version, dynamic_phrases = store.snapshot()
+    prompt = render_sql_prompt(dynamic_phrases)
+    _sql_prompt_cache["version"], _sql_prompt_cache["prompt"] = version, prompt
+    return list(prompt)
+
+def render_sql_prompt(dynamic_phrases):
     phrase_text = "\n".join(f"- {p}" for p in dynamic_phrases) if dynamic_phrases else "- None found."
 
     return [f"""
@@ -110,18 +111,22 @@ def build_sql_prompt():
     {phrase_text}
     """]
 
+def prepare_model_question(prompt: str, sql_prompt_list=None):
+    # (blocking phrase or None, system prompt): the pre-filter, then the phrase index,
+    # whose relevant phrases are listed in the prompt unless one is given
+    blocked_phrase = get_phrase_matcher().first_match(prompt)
+    if blocked_phrase or sql_prompt_list is not None:
+        return blocked_phrase, sql_prompt_list
+    blocking_phrase, relevant_phrases = match_phrases(prompt)
+    return blocking_phrase, render_sql_prompt(relevant_phrases)
+
+def evaluate_question(prompt: str, sql_prompt_list=None) -> dict:
+    # manager_core.evaluate_question with the phrase-trained prompt and both phrase checks
+    return manager_core.evaluate_question(
+        prompt, lambda p: prepare_model_question(p, sql_prompt_list), "trained_manager.nl_to_sql")
+
 def test_prompt(prompt: str, sql_prompt_list=None):
-    if sql_prompt_list is None:
-        sql_prompt_list = build_sql_prompt()
-    try:
-        sql_query = get_gemini_response(prompt, sql_prompt_list)
-        result = read_sql_query(sql_query, "contact_manager.db")
-        if result and len(result) == 1 and "Unauthorized access" in result[0][0]:
-            return "REFUSED"
-        else:
-            return "SUCCESS"
-    except Exception as e:
-        return "REFUSED"
+    return evaluate_question(prompt, sql_prompt_list)["verdict"]
 
 def main():
     print("\n--- Contact Manager (CLI Version) ---")
@@ -131,11 +136,33 @@ def main():
             print("Exiting.")
             break
 
-        sql_query = get_gemini_response(question, build_sql_prompt())
+        intent = parse_intent(question)
+        blocked_phrase = None if intent else get_phrase_matcher().first_match(question)
+        if blocked_phrase:
+            print(f"[Debug] ❌ Known jailbreak phrase \"{blocked_phrase}\". Blocking request.")
+            continue
+
+        if intent:
+            sql_query, user_name, params = intent.sql, intent.user_name, intent.params
+        else:
+            blocking_phrase, relevant_phrases = match_phrases(question)
+            if blocking_phrase:
+                print(f"[Debug] ❌ Too close to known jailbreak phrase \"{blocking_phrase}\". Blocking request.")
+                continue
+
+            try:
+                sql_query = get_gemini_response(question, render_sql_prompt(relevant_phrases), stream=True)
+            except SQLStreamAborted as e:
+                print(f"[Debug] ❌ {e.reason}. Blocking execution.")
+                continue
+            except TransportError as e:
+                print(f"[Debug] ⚠️ Model unavailable, try again later: {e}")
+                continue
+            user_name, params = claimed_user_name(question), ()
 
         try:
-            result = read_sql_query(sql_query, "contact_manager.db")
-            if result and len(result) == 1 and "Unauthorized access" in result[0][0]:
+            result = read_sql_query(sql_query, "contact_manager.db", user_name, params)
+            if is_unauthorized(result):
                 print("Error:", result[0][0])
             else:
                 print("\nQuery Results:")